@@ -1,66 +1,319 @@
 import streamlit as st
 import pandas as pd
-from docx import Document
+import numpy as np
+import pyarrow as pa
+import lxml.etree as ET
+from openpyxl import Workbook
 from io import BytesIO
 from datetime import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import os
 from pathlib import Path
 import json
+import hashlib
+import pickle
+import shutil
+import uuid
+import zipfile
+
+CACHE_DIR = Path('.cache') / 'docx_tables'
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# 预先拼好表格解析中用到的标签和路径，避免在逐单元格的循环中重复构造字符串
+W_BODY = W + 'body'
+W_TBL = W + 'tbl'
+W_TR = W + 'tr'
+W_TC = W + 'tc'
+W_P = W + 'p'
+W_T = W + 't'
+W_R = W + 'r'
+W_HYPERLINK = W + 'hyperlink'
+W_BR = W + 'br'
+W_VAL = W + 'val'
+W_TYPE = W + 'type'
+# 与python-docx一致：制表符、软回车等run内元素转换为对应的字符
+RUN_SPECIAL_TEXT = {W + 'tab': '\t', W + 'ptab': '\t', W + 'cr': '\n', W + 'noBreakHyphen': '-'}
+W_GRID_BEFORE = f'{W}trPr/{W}gridBefore'
+W_GRID_AFTER = f'{W}trPr/{W}gridAfter'
+W_GRID_SPAN = f'{W}tcPr/{W}gridSpan'
+W_V_MERGE = f'{W}tcPr/{W}vMerge'
+NAT_I8 = np.iinfo(np.int64).min
+
+def _key_folders(folders):
+    """为每个文件夹配置分配一个稳定的id，返回{id: 配置}"""
+    return {uuid.uuid4().hex: folder for folder in folders}
+
+@st.cache_data(show_spinner=False)
+def _read_config(config_file):
+    """读取并缓存配置文件，读取失败时直接抛出异常，不缓存错误结果"""
+    if os.path.exists(config_file):
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return _key_folders(config.get('folders', []))
+    return {}
 
 def load_config(config_file='config.json'):
     """从配置文件加载设置"""
     try:
-        if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            return config.get('folders', [])
-        return []
+        return _read_config(config_file)
     except Exception as e:
         st.error(f"读取配置文件出错：{str(e)}")
-        return []
+        return {}
+
+@st.cache_resource
+def _config_saved_state():
+    """记录每个配置文件最近一次写入的内容哈希及文件修改时间，进程内所有会话共享"""
+    return {}
 
 def save_config(folders, config_file='config.json'):
     """保存设置到配置文件"""
     try:
-        config = {'folders': folders}
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, ensure_ascii=False, indent=4)
+        config = {'folders': list(folders.values())}
+        content = json.dumps(config, ensure_ascii=False, separators=(',', ':'))
+        
+        # 与上次写入的内容相同且文件此后未被其他会话或外部修改时不再写盘
+        saved_state = _config_saved_state()
+        content_hash = hash(content)
+        try:
+            current_mtime = os.stat(config_file).st_mtime_ns
+        except OSError:
+            current_mtime = None
+        if saved_state.get(config_file) == (content_hash, current_mtime):
+            return True
+        
+        # 先写临时文件再替换，避免写到一半时留下损坏的配置文件；
+        # 多个会话在同一进程的不同线程中运行，临时文件名需各不相同
+        tmp_file = f"{config_file}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                written_mtime = os.fstat(f.fileno()).st_mtime_ns
+            os.replace(tmp_file, config_file)
+        except Exception:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        
+        saved_state[config_file] = (content_hash, written_mtime)
+        _read_config.clear()
         return True
     except Exception as e:
         st.error(f"保存配置文件出错：{str(e)}")
         return False
 
 def get_all_word_files(folder_path):
-    """获取文件夹下所有的Word文件"""
+    """获取文件夹下所有的Word文件，按文件大小从大到小排列"""
     word_files = []
-    for file in Path(folder_path).rglob("*.docx"):
-        word_files.append(file)
-    return word_files
+    pending = [folder_path]
+    while pending:
+        # 与rglob一致：跳过没有读取权限的文件夹，不进入指向文件夹的符号链接
+        try:
+            entries = os.scandir(pending.pop())
+        except PermissionError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name.lower().endswith('.docx'):
+                    # 失效的符号链接或遍历期间被删除的文件排在最后，由解析步骤单独报告失败
+                    try:
+                        size = entry.stat().st_size
+                    except OSError:
+                        size = 0
+                    word_files.append((size, entry.path))
+    
+    # 大文件解析耗时最长，排在前面让进程池先处理，缩短整体等待时间
+    word_files.sort(reverse=True)
+    return [Path(path) for _, path in word_files]
+
+def _discover_word_files(folder_path):
+    """检查文件夹是否存在并获取其中的Word文件，不存在时返回None"""
+    if not os.path.exists(folder_path):
+        return None
+    return get_all_word_files(folder_path)
+
+def _grid_value(tr, path):
+    """读取行属性中的gridBefore/gridAfter，即行首/行尾跳过的网格列数"""
+    el = tr.find(path)
+    return int(el.get(W_VAL, 0)) if el is not None else 0
+
+def _run_text(r):
+    """取得<w:r>的文本，换行符和制表符等按python-docx的规则转换"""
+    parts = []
+    for child in r:
+        if child.tag == W_T:
+            if child.text:
+                parts.append(child.text)
+        elif child.tag == W_BR:
+            # 只有普通换行对应"\n"，分页符和分栏符没有文本
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif child.tag in RUN_SPECIAL_TEXT:
+            parts.append(RUN_SPECIAL_TEXT[child.tag])
+    return ''.join(parts)
+
+def _paragraph_text(p):
+    """取得<w:p>的文本，包括直接子级的run和超链接中的run"""
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(r) for r in child.iterfind(W_R))
+    return ''.join(parts)
+
+def _read_table_rows(tbl):
+    """读取<w:tbl>中每行的单元格文本，合并单元格按网格列展开"""
+    table_data = []
+    above = []
+    for tr in tbl.iterfind(W_TR):
+        row_data = [''] * _grid_value(tr, W_GRID_BEFORE)
+        for tc in tr.iterfind(W_TC):
+            span = tc.find(W_GRID_SPAN)
+            span = int(span.get(W_VAL, 1)) if span is not None else 1
+            v_merge = tc.find(W_V_MERGE)
+            
+            if v_merge is not None and v_merge.get(W_VAL, 'continue') == 'continue':
+                # 纵向合并的后续单元格沿用上一行同一网格列的文本
+                merged = above[len(row_data):len(row_data) + span]
+                row_data.extend(merged + [''] * (span - len(merged)))
+            else:
+                text = '\n'.join(_paragraph_text(p) for p in tc.iterfind(W_P)).strip()
+                row_data.extend([text] * span)
+        row_data.extend([''] * _grid_value(tr, W_GRID_AFTER))
+        table_data.append(row_data)
+        above = row_data
+    return table_data
+
+def _table_to_dataframe(table_data):
+    """以首行为表头，按列构建pyarrow字符串列的DataFrame"""
+    header, rows = table_data[0], table_data[1:]
+    
+    # 行宽与表头不一致时交给pandas按原方式处理
+    if any(len(row) != len(header) for row in rows):
+        return pd.DataFrame(rows, columns=header)
+    
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    table = pa.Table.from_arrays(
+        [pa.array(col, type=pa.string()) for col in columns],
+        names=header
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
 
 def extract_tables_from_word(file_path):
-    """从Word文件中提取所有表格"""
-    try:
-        doc = Document(file_path)
-        all_tables = []
-        
-        for table in doc.tables:
-            # 提取表格数据
-            table_data = []
-            for row in table.rows:
-                row_data = []
-                for cell in row.cells:
-                    row_data.append(cell.text.strip())
-                table_data.append(row_data)
+    """从Word文件中提取所有表格，直接流式解析word/document.xml"""
+    all_tables = []
+    
+    # ZipFile只读取目录和document.xml本身，边解压边解析，不在内存中保留整个XML
+    with zipfile.ZipFile(file_path) as z, z.open('word/document.xml') as xml:
+        for _, tbl in ET.iterparse(xml, events=('end',), tag=W_TBL):
+            # 只处理正文中的顶层表格，嵌套表格随外层表格一起释放
+            if tbl.getparent().tag != W_BODY:
+                continue
+            
+            table_data = _read_table_rows(tbl)
+            
+            # 释放已处理的表格及其之前的段落
+            tbl.clear()
+            while tbl.getprevious() is not None:
+                del tbl.getparent()[0]
             
             # 转换为DataFrame
             if table_data:
-                df = pd.DataFrame(table_data[1:], columns=table_data[0])
-                all_tables.append(df)
+                all_tables.append(_table_to_dataframe(table_data))
+    
+    return all_tables
+
+def extract_tables_cached(file_path):
+    """带磁盘缓存的表格提取，按(路径, 修改时间, 大小)判断文件是否变化"""
+    stat = os.stat(file_path)
+    path_key = hashlib.blake2b(str(file_path).encode(), digest_size=16).hexdigest()
+    version_key = hashlib.blake2b(
+        f"{file_path}|{stat.st_mtime_ns}|{stat.st_size}".encode(), digest_size=16
+    ).hexdigest()
+    cache_file = CACHE_DIR / f"{path_key}_{version_key}.pkl"
+    
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            pass
+    
+    tables = extract_tables_from_word(file_path)
+    
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
         
-        return all_tables
+        # 文件变化后旧版本的缓存不会再命中，每个文件只保留最新的一份
+        for stale_file in CACHE_DIR.glob(f"{path_key}_*.pkl"):
+            if stale_file != cache_file:
+                stale_file.unlink(missing_ok=True)
+    except OSError:
+        pass
+    
+    return tables
+
+def clear_table_cache():
+    """删除磁盘上的表格缓存"""
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+def _extract_with_meta(file_path, folder_key):
+    """在子进程中提取表格，出错时返回错误信息而不调用st"""
+    try:
+        return file_path.name, folder_key, extract_tables_cached(file_path), None
     except Exception as e:
-        st.error(f"无法打开文件 {file_path.name}：{str(e)}")
-        return []
+        return file_path.name, folder_key, [], str(e)
+
+def _file_fingerprint(file_path):
+    """st.cache_data使用的文件标识：路径、修改时间和大小"""
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return str(file_path), None, None
+    return str(file_path), stat.st_mtime_ns, stat.st_size
+
+@st.cache_data(show_spinner=False, max_entries=1, hash_funcs={type(Path()): _file_fingerprint})
+def _extract_all(file_paths, folder_keys):
+    """使用进程池解析所有Word文件，文件均未变化时直接复用上次的结果"""
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(_extract_with_meta, file_paths, folder_keys, chunksize=4))
+
+def dataframes_to_excel(frames):
+    """以openpyxl只写模式依次写出多个DataFrame到同一个工作表，返回Excel文件缓冲区"""
+    # 表头取所有DataFrame列的并集，与pd.concat的列顺序一致
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Sheet1')
+    ws.append(columns)
+    
+    for df in frames:
+        # 空值写为空单元格，与to_excel的默认行为一致
+        df = df.reindex(columns=columns)
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(row)
+    
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+def _parse_dates(values):
+    """只解析不重复的日期字符串，再按编码映射回整列"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(np.asarray(uniques, dtype=object), errors='coerce')
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name)
 
 def process_date_warnings(df, date_rules):
     """处理多组日期预警"""
@@ -76,32 +329,40 @@ def process_date_warnings(df, date_rules):
             continue
             
         # 转换起始日期
-        df[start_col] = pd.to_datetime(df[start_col], errors='coerce')
+        df[start_col] = _parse_dates(df[start_col])
         
         # 获取终止日期
+        start_values = df[start_col].to_numpy()
         if end_col and end_col in df.columns:
-            end_dates = pd.to_datetime(df[end_col], errors='coerce')
+            df[end_col] = _parse_dates(df[end_col])
+            end_values = df[end_col].to_numpy()
         else:
-            end_dates = pd.Timestamp.now()
-            
-        # 计算日期差
-        days_diff = (end_dates - df[start_col]).dt.days
+            end_values = np.asarray(np.datetime64(pd.Timestamp.now()))
         
-        # 计算剩余稳定性期限
-        remaining_days = stability_days - days_diff
+        # 换算到两者中较粗的时间单位后按int64计算，不强转纳秒，避免1677-2262年以外的日期溢出
+        unit = max(np.datetime_data(start_values.dtype)[0], np.datetime_data(end_values.dtype)[0],
+                   key=lambda u: np.timedelta64(1, u))
+        start_i8 = start_values.astype(f'datetime64[{unit}]').view('i8')
+        end_i8 = end_values.astype(f'datetime64[{unit}]').view('i8')
+            
+        # 计算日期差，任一日期为空时结果为NaN
+        days_diff = (end_i8 - start_i8) // (np.timedelta64(1, 'D') // np.timedelta64(1, unit))
+        valid = (start_i8 != NAT_I8) & (end_i8 != NAT_I8)
+        if not valid.all():
+            days_diff = np.where(valid, days_diff, np.nan)
         
         # 标记超过预警天数的样品
         warning_mask = days_diff > warning_days
         
         if warning_mask.any():
             warning_results.append({
-                'mask': warning_mask,
+                'mask': pd.Series(warning_mask, index=df.index),
                 'start_col': start_col,
                 'end_col': end_col or '当前日期',
                 'warning_days': warning_days,
                 'stability_days': stability_days,
-                'days_diff': days_diff,
-                'remaining_days': remaining_days
+                'days_diff': pd.Series(days_diff, index=df.index),
+                'remaining_days': pd.Series(stability_days - days_diff, index=df.index)
             })
     
     return df, warning_results
@@ -117,7 +378,7 @@ def config_editor():
     with tab1:
         # 显示当前配置
         with st.expander("当前配置", expanded=True):
-            current_config = {'folders': st.session_state.folders}
+            current_config = {'folders': list(st.session_state.folders.values())}
             st.json(current_config)
         
         # 添加新配置
@@ -151,7 +412,7 @@ def config_editor():
                         'stability_days': stability_days
                     }
                 }
-                st.session_state.folders.append(new_config)
+                st.session_state.folders[uuid.uuid4().hex] = new_config
                 save_config(st.session_state.folders)
                 st.success("配置已添加")
                 st.rerun()
@@ -162,7 +423,7 @@ def config_editor():
         with col1:
             st.subheader("导出配置")
             if st.session_state.folders:
-                config_data = {'folders': st.session_state.folders}
+                config_data = {'folders': list(st.session_state.folders.values())}
                 config_json = json.dumps(config_data, ensure_ascii=False, indent=4)
                 
                 export_filename = st.text_input(
@@ -190,7 +451,7 @@ def config_editor():
                 try:
                     imported_config = json.load(uploaded_file)
                     if 'folders' in imported_config:
-                        st.session_state.folders = imported_config['folders']
+                        st.session_state.folders = _key_folders(imported_config['folders'])
                         save_config(st.session_state.folders)
                         st.success("配置导入成功！")
                         st.rerun()
@@ -199,6 +460,179 @@ def config_editor():
                 except Exception as e:
                     st.error(f"导入配置文件失败：{str(e)}")
 
+def _delete_folder(folder_id):
+    """删除按钮的回调：移除指定文件夹并保存配置"""
+    del st.session_state.folders[folder_id]
+    save_config(st.session_state.folders)
+
+def _clear_folders(persist):
+    """清除按钮的回调：清空文件夹列表，persist为True时同时清空配置文件"""
+    st.session_state.folders = {}
+    if persist:
+        save_config({})
+
+@st.fragment
+def _render_folder_sidebar():
+    """侧边栏中的现有文件夹列表，增删只重新运行该片段而不触发表格处理"""
+    for i, (folder_id, folder) in enumerate(st.session_state.folders.items()):
+        st.markdown(f"""
+        #### 📁 {folder['name'] or f'文件夹 {i+1}'}
+        - 路径：`{folder['path']}`
+        - 起始日期列：`{folder['rule']['start_column']}`
+        - 终止日期列：`{folder['rule']['end_column'] or '当前日期'}`
+        - 预警天数：{folder['rule']['warning_days']}天
+        - 稳定性期限：{folder['rule']['stability_days']}天
+        """)
+        
+        # 使用回调在片段重新运行前完成删除，无需再调用st.rerun
+        st.button(f"删除文件夹 {i+1}", key=f"delete_{folder_id}", on_click=_delete_folder, args=(folder_id,))
+        st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.button("清除现有配置", type="secondary", on_click=_clear_folders, args=(False,))
+    with col2:
+        st.button("清除所有配置", type="secondary", on_click=_clear_folders, args=(True,))
+
+def _run_processing(folders):
+    """遍历并解析所有文件夹中的Word文件，返回汇总表格、预警信息及处理状态"""
+    all_warning_samples = []
+    merged_all = None
+    status_summary = Counter()
+    excel_data = None
+    warning_data = None
+    open_errors = []
+    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    folder_status = {
+        'success': [],
+        'empty': [],
+        'error': [],
+        'file_errors': {}
+    }
+
+    # 各文件夹的遍历互不依赖，使用线程池同时进行
+    word_jobs = []
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(folders)))) as executor:
+        future_to_cfg = [
+            (folder_config, executor.submit(_discover_word_files, folder_config['path']))
+            for folder_config in folders
+        ]
+        for folder_config, future in future_to_cfg:
+            folder_name = folder_config['name']
+            folder_path = folder_config['path']
+            
+            try:
+                word_files = future.result()
+                if word_files is None:
+                    folder_status['error'].append((folder_name, f"文件夹路径不存在: {folder_path}"))
+                    continue
+                
+                if not word_files:
+                    folder_status['empty'].append(folder_name)
+                    continue
+                
+                word_jobs.append((folder_config, word_files))
+            except Exception as e:
+                folder_status['error'].append((folder_name, str(e)))
+
+    # 使用进程池并行解析所有Word文件，所有表格收集到同一个列表中只合并一次
+    # 文件夹名称可以为空或重复，解析结果按配置在word_jobs中的位置归属
+    file_paths = [p for _, word_files in word_jobs for p in word_files]
+    folder_keys = [i for i, (_, word_files) in enumerate(word_jobs) for _ in word_files]
+    folder_results = [{'columns': {}, 'processed': 0, 'failed': []} for _ in word_jobs]
+    flat_tables = []
+    table_keys = []
+    extracted = []
+    if file_paths:
+        try:
+            extracted = _extract_all(file_paths, folder_keys)
+        except BrokenProcessPool as e:
+            # 解析进程崩溃或被系统终止时，把涉及的文件夹记为处理失败，而不是让整个页面出错
+            for folder_config, _ in word_jobs:
+                folder_status['error'].append((folder_config['name'], f"解析进程异常退出: {str(e)}"))
+            word_jobs = []
+
+    for file_name, folder_key, tables, error in extracted:
+        result = folder_results[folder_key]
+        folder_name = word_jobs[folder_key][0]['name']
+        if error is not None:
+            open_errors.append((file_name, error))
+        if tables:
+            for table in tables:
+                table = table.assign(文件名=file_name, 来源文件夹=folder_name)
+                result['columns'].update(dict.fromkeys(table.columns))
+                flat_tables.append(table)
+                table_keys.append(folder_key)
+            result['processed'] += 1
+        else:
+            result['failed'].append(file_name)
+
+    if flat_tables:
+        merged_all = pd.concat(flat_tables, ignore_index=True)
+        row_keys = np.repeat(table_keys, [len(table) for table in flat_tables])
+
+    for folder_key, (folder_config, _) in enumerate(word_jobs):
+        folder_name = folder_config['name']
+        folder_columns = list(folder_results[folder_key]['columns'])
+        processed_files = folder_results[folder_key]['processed']
+        failed_files = folder_results[folder_key]['failed']
+        
+        try:
+            if failed_files:
+                folder_status['file_errors'][folder_name] = failed_files
+
+            if folder_columns:
+                folder_mask = row_keys == folder_key
+                folder_merged = merged_all.loc[folder_mask, folder_columns].reset_index(drop=True)
+                
+                folder_merged, warning_results = process_date_warnings(folder_merged, [folder_config['rule']])
+                
+                # 日期列在预警计算时已转换为datetime，直接格式化即可，并同步回汇总表格
+                for date_col in (folder_config['rule']['start_column'], folder_config['rule']['end_column']):
+                    if date_col in folder_merged.columns and pd.api.types.is_datetime64_any_dtype(folder_merged[date_col]):
+                        folder_merged[date_col] = folder_merged[date_col].dt.strftime('%Y-%m-%d')
+                        merged_all.loc[folder_mask, date_col] = folder_merged[date_col].to_numpy()
+                
+                for warning in warning_results:
+                    # 剩余期限超过30天的属于正常样品，先过滤掉再生成状态标签
+                    remaining_days = warning['remaining_days'].to_numpy()
+                    idx = np.flatnonzero(warning['mask'].to_numpy() & (remaining_days <= 30))
+                    if not idx.size:
+                        continue
+                    
+                    remaining = remaining_days[idx]
+                    warning_samples = folder_merged.take(idx)
+                    warning_samples['已用天数'] = warning['days_diff'].to_numpy()[idx]
+                    warning_samples['剩余稳定性期限(天)'] = remaining
+                    warning_samples['状态'] = np.where(remaining <= 0, '❌ 已超期', '⚠️ 接近超期')
+                    
+                    all_warning_samples.append(warning_samples)
+                    status_summary.update(warning_samples['状态'])
+
+                folder_status['success'].append((folder_name, processed_files, len(failed_files)))
+
+        except Exception as e:
+            folder_status['error'].append((folder_name, str(e)))
+
+    if merged_all is not None:
+        excel_data = dataframes_to_excel([merged_all]).getvalue()
+
+    if all_warning_samples:
+        # 各文件夹的预警数据直接依次写入Excel，不再合并成一个DataFrame
+        warning_data = dataframes_to_excel(all_warning_samples).getvalue()
+
+    return {
+        'folder_status': folder_status,
+        'open_errors': open_errors,
+        'merged_all': merged_all,
+        'all_warning_samples': all_warning_samples,
+        'status_summary': status_summary,
+        'excel_data': excel_data,
+        'warning_data': warning_data,
+        'current_time': current_time
+    }
+
 def process_tables():
     """表格处理界面"""
     with st.container():
@@ -240,123 +674,32 @@ def process_tables():
                         'stability_days': stability_days
                     }
                 }
-                st.session_state.folders.append(new_folder)
+                st.session_state.folders[uuid.uuid4().hex] = new_folder
                 save_config(st.session_state.folders)
         
         st.markdown("---")
         st.subheader("现有文件夹")
-        
-        for i, folder in enumerate(st.session_state.folders):
-            st.markdown(f"""
-            #### 📁 {folder['name'] or f'文件夹 {i+1}'}
-            - 路径：`{folder['path']}`
-            - 起始日期列：`{folder['rule']['start_column']}`
-            - 终止日期列：`{folder['rule']['end_column'] or '当前日期'}`
-            - 预警天数：{folder['rule']['warning_days']}天
-            - 稳定性期限：{folder['rule']['stability_days']}天
-            """)
-            
-            if st.button(f"删除文件夹 {i+1}", key=f"delete_{i}"):
-                st.session_state.folders.pop(i)
-                save_config(st.session_state.folders)
-                st.rerun()
-            st.markdown("---")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("清除现有配置", type="secondary"):
-                st.session_state.folders = []
-                st.rerun()
-        with col2:
-            if st.button("清除所有配置", type="secondary"):
-                st.session_state.folders = []
-                save_config([])
-                st.rerun()
+        _render_folder_sidebar()
 
-    all_tables = []
-    all_warning_samples = []
-    merged_all = None
-    combined_warnings = None
-    status_summary = pd.Series()
-    excel_buffer = None
-    warning_buffer = None
-    current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-    folder_status = {
-        'success': [],
-        'empty': [],
-        'error': [],
-        'file_errors': {}
-    }
-
-    for folder_config in st.session_state.folders:
-        folder_name = folder_config['name']
-        folder_path = folder_config['path']
-        
-        try:
-            if not os.path.exists(folder_path):
-                folder_status['error'].append((folder_name, f"文件夹路径不存在: {folder_path}"))
-                continue
-
-            word_files = get_all_word_files(folder_path)
-            
-            if not word_files:
-                folder_status['empty'].append(folder_name)
-                continue
-            
-            folder_tables = []
-            processed_files = 0
-            failed_files = []
-            
-            for file_path in word_files:
-                try:
-                    tables = extract_tables_from_word(file_path)
-                    if tables:
-                        for table in tables:
-                            table['文件名'] = file_path.name
-                            table['来源文件夹'] = folder_name
-                            folder_tables.extend([table])
-                        processed_files += 1
-                    else:
-                        failed_files.append(file_path.name)
-                except Exception as e:
-                    failed_files.append(file_path.name)
-                    continue
-            
-            if failed_files:
-                folder_status['file_errors'][folder_name] = failed_files
-
-            if folder_tables:
-                folder_merged = pd.concat(folder_tables, ignore_index=True)
-                all_tables.append(folder_merged)
-                
-                folder_merged, warning_results = process_date_warnings(folder_merged, [folder_config['rule']])
-                
-                date_col = folder_config['rule']['start_column']
-                if date_col in folder_merged.columns:
-                    folder_merged[date_col] = pd.to_datetime(folder_merged[date_col]).dt.strftime('%Y-%m-%d')
-                
-                end_col = folder_config['rule']['end_column']
-                if end_col and end_col in folder_merged.columns:
-                    folder_merged[end_col] = pd.to_datetime(folder_merged[end_col]).dt.strftime('%Y-%m-%d')
-                
-                for warning in warning_results:
-                    warning_samples = folder_merged[warning['mask']].copy()
-                    warning_samples['已用天数'] = warning['days_diff'][warning['mask']]
-                    warning_samples['剩余稳定性期限(天)'] = warning['remaining_days'][warning['mask']]
-                    
-                    warning_samples['状态'] = warning_samples['剩余稳定性期限(天)'].apply(
-                        lambda x: '❌ 已超期' if x <= 0 else ('⚠️ 接近超期' if x <= 30 else '✅ 正常')
-                    )
-                    warning_samples = warning_samples[warning_samples['状态'] != '✅ 正常']
-                    
-                    if not warning_samples.empty:
-                        all_warning_samples.append(warning_samples)
-
-                folder_status['success'].append((folder_name, processed_files, len(failed_files)))
-
-        except Exception as e:
-            folder_status['error'].append((folder_name, str(e)))
+    # 配置变更不会自动重新处理，只在首次进入或点击按钮时运行
+    folders = list(st.session_state.folders.values())
+    folders_hash = hash(json.dumps(folders, ensure_ascii=False, sort_keys=True))
+    if st.button("运行处理", type="primary") or 'processed_result' not in st.session_state:
+        with st.spinner("正在处理Word文件..."):
+            st.session_state.processed_result = _run_processing(folders)
+        st.session_state.processed_hash = folders_hash
+    elif st.session_state.processed_hash != folders_hash:
+        st.info("文件夹配置已更改，点击“运行处理”以更新结果")
+    
+    result = st.session_state.processed_result
+    folder_status = result['folder_status']
+    merged_all = result['merged_all']
+    all_warning_samples = result['all_warning_samples']
+    status_summary = result['status_summary']
+    current_time = result['current_time']
+    
+    for file_name, error in result['open_errors']:
+        st.error(f"无法打开文件 {file_name}：{error}")
 
     st.header("处理状态摘要")
     
@@ -397,19 +740,6 @@ def process_tables():
 
     st.markdown("---")
 
-    if all_tables:
-        merged_all = pd.concat(all_tables, ignore_index=True)
-        excel_buffer = BytesIO()
-        merged_all.to_excel(excel_buffer, index=False)
-        excel_buffer.seek(0)
-
-    if all_warning_samples:
-        combined_warnings = pd.concat(all_warning_samples, ignore_index=True)
-        status_summary = combined_warnings['状态'].value_counts()
-        warning_buffer = BytesIO()
-        combined_warnings.to_excel(warning_buffer, index=False)
-        warning_buffer.seek(0)
-
     tab1, tab2 = st.tabs(["数据汇总", "预警信息"])
     
     with tab1:
@@ -421,7 +751,7 @@ def process_tables():
             with col1:
                 st.download_button(
                     label="📥 下载汇总表格",
-                    data=excel_buffer,
+                    data=result['excel_data'],
                     file_name=f'汇总表格_{current_time}.xlsx',
                     mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                 )
@@ -429,7 +759,7 @@ def process_tables():
             st.info("暂无数据")
 
     with tab2:
-        if combined_warnings is not None:
+        if all_warning_samples:
             st.subheader("预警信息")
             
             col1, col2, col3 = st.columns(3)
@@ -438,26 +768,36 @@ def process_tables():
             with col2:
                 st.metric("接近超期样品", f"{status_summary.get('⚠️ 接近超期', 0)}个")
             with col3:
-                st.metric("总预警样品", f"{len(combined_warnings)}个")
+                st.metric("总预警样品", f"{sum(status_summary.values())}个")
             
             st.markdown("---")
-            st.dataframe(combined_warnings, use_container_width=True)
+            # 页面上仍显示为一张可排序的汇总表，Excel导出则按文件夹依次写入
+            st.dataframe(pd.concat(all_warning_samples, ignore_index=True), use_container_width=True)
             
             col1, _ = st.columns([1, 3])
             with col1:
                 st.download_button(
                     label="📥 下载预警信息",
-                    data=warning_buffer,
+                    data=result['warning_data'],
                     file_name=f'预警信息_{current_time}.xlsx',
                     mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
                 )
         else:
             st.info("暂无预警信息")
 
-    if st.button("清除所有缓存数据"):
-        st.session_state.warning_data = {}
-        st.session_state.merged_tables = {}
-        st.rerun()
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("清除所有缓存数据"):
+            st.session_state.warning_data = {}
+            st.session_state.merged_tables = {}
+            st.session_state.pop('processed_result', None)
+            st.rerun()
+    with col2:
+        if st.button("清除文件解析缓存"):
+            clear_table_cache()
+            st.cache_data.clear()
+            st.session_state.pop('processed_result', None)
+            st.rerun()
 
 def main():
     st.set_page_config(